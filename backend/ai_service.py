@@ -9,23 +9,78 @@ Required env var:
     HF_API_TOKEN  –  Get yours free at https://huggingface.co/settings/tokens
 """
 
+import io
 import os
+import re
 import time
 import math
-import struct
+import json
+import atexit
+import hashlib
+import threading
+import wave
 import shutil
+import tempfile
 import subprocess
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import certifi
 import requests
-import urllib3
+from requests.adapters import HTTPAdapter
 from huggingface_hub import InferenceClient
 from typing import Dict, Optional
 
-# Suppress SSL warnings for LibreSSL compatibility on macOS
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+try:  # optional: fuses the audio stats into one pass over the samples
+    from numba import njit
+except ImportError:
+    njit = None
 
 # ── Hugging Face model config ──────────────────────────────────────
 WHISPER_MODEL = "openai/whisper-large-v3-turbo"
 CHAT_MODEL = "Qwen/Qwen2.5-72B-Instruct"
+SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+
+# Classifier label names → our labels (some endpoints return LABEL_n)
+SENTIMENT_LABELS = {
+    "positive": "positive", "negative": "negative", "neutral": "neutral",
+    "label_0": "negative", "label_1": "neutral", "label_2": "positive",
+}
+# Grammar-constrained output for the Qwen sentiment fallback: the model can
+# only emit this object, so no markdown unwrapping or free text to parse
+SENTIMENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "sentiment",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "label": {"enum": ["positive", "negative", "neutral"]},
+                "score": {"type": "number"},
+            },
+            "required": ["label", "score"],
+        },
+    },
+}
+# Local fast path: a tiny Turkish lexicon (word prefixes) combined with voice
+# tone. Only when both agree strongly is the HF call skipped altogether.
+POSITIVE_WORDS = ("mutlu", "harika", "güzel", "sevin", "süper", "mükemmel", "teşekkür",
+                  "şükür", "keyif", "eğlen", "huzur", "gurur", "heyecan", "başardı")
+NEGATIVE_WORDS = ("üzgün", "üzül", "kötü", "berbat", "sinir", "kızgın", "öfke", "mutsuz",
+                  "stres", "endişe", "kork", "ağla", "kırgın", "bıktım", "yalnız", "yorgun")
+# Turkish mostly negates with a verb suffix (olmadım, geçmedi, sevmiyorum,
+# olmaz), which a prefix lexicon can't follow: clauses with any of these
+# are left to the classifier
+NEGATION_WORDS = ("değil", "yok", "hiç", "asla")
+NEGATED_VERB = re.compile(r"\w{2,}(?:m[ae][dyzms]|m[ıiuü]yor)")
+CLAUSE_SPLIT = re.compile(r"[,.;:!?\n]+|\b(?:ama|fakat|ancak|çünkü)\b")
+LOCAL_SENTIMENT_THRESHOLD = 0.7
+# Below this many characters the text carries no usable signal; above the
+# max (~300 tokens of Turkish) more text doesn't change the label
+SENTIMENT_MIN_CHARS = 20
+SENTIMENT_MAX_CHARS = 1200
+# How far voice tone may shift the classifier's per-label probabilities
+VOICE_BIAS = 0.15
 
 # ffmpeg path: try env var, then system PATH, then common locations
 def _find_ffmpeg() -> str:
@@ -41,9 +96,53 @@ def _find_ffmpeg() -> str:
     return "ffmpeg"  # fallback — hope it's in PATH
 
 FFMPEG_PATH = _find_ffmpeg()
+FFMPEG_PIPE_BUFSIZE = 1 << 20  # 1 MB pipe reads instead of io's 8 KB default
+
+
+def _audio_stats_numpy(samples: np.ndarray, seg_size: int):
+    """Per-segment sum of squares, peak and zero-crossing count (NumPy)."""
+    # Squares stay integer (32768² fits int32) and sums accumulate in
+    # int64, so there is no float32 up-cast of the whole buffer
+    sq = np.square(samples, dtype=np.int32)
+    seg_sums = np.add.reduceat(sq, np.arange(0, len(samples), seg_size), dtype=np.int64)
+    peak = max(int(samples.max()), -int(samples.min()))
+    signs = np.signbit(samples)
+    crossings = np.count_nonzero(signs[1:] != signs[:-1])
+    return seg_sums, peak, crossings
+
+
+def _audio_stats_loop(samples, seg_size):
+    """Same stats as _audio_stats_numpy in a single pass; compiled by numba."""
+    n = samples.shape[0]
+    seg_sums = np.zeros((n + seg_size - 1) // seg_size, dtype=np.int64)
+    peak = 0
+    crossings = 0
+    prev_neg = samples[0] < 0
+    for seg in range(seg_sums.shape[0]):
+        acc = 0
+        for i in range(seg * seg_size, min(n, (seg + 1) * seg_size)):
+            v = np.int64(samples[i])
+            acc += v * v
+            if abs(v) > peak:
+                peak = abs(v)
+            neg = v < 0
+            if neg != prev_neg:
+                crossings += 1
+            prev_neg = neg
+        seg_sums[seg] = acc
+    return seg_sums, peak, crossings
+
+
+_audio_stats = njit(cache=True, fastmath=True)(_audio_stats_loop) if njit else _audio_stats_numpy
 
 # HF Inference API base for raw requests (whisper needs custom Content-Type)
 HF_API_URL = "https://router.huggingface.co/hf-inference/models"
+HF_TIMEOUT = float(os.getenv("HF_TIMEOUT", 60))  # seconds, per chat/classifier call
+
+# Sentiment/feedback results keyed by a hash of their inputs, so retries and
+# re-uploads of the same recording skip the chat completion round trip.
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ai_cache.json")
+CACHE_MAX_ENTRIES = 1024
 
 
 class AIService:
@@ -58,9 +157,97 @@ class AIService:
                 "ve backend/.env dosyasına HF_API_TOKEN=hf_... şeklinde ekleyin."
             )
         self.headers = {"Authorization": f"Bearer {self.api_token}"}
-        self.hf_client = InferenceClient(token=self.api_token)
+        # Calls block a pool worker, so never let one hang indefinitely
+        self.hf_client = InferenceClient(token=self.api_token, timeout=HF_TIMEOUT)
+        # Keep-alive session so Whisper uploads reuse the TCP/TLS connection
+        self.http = requests.Session()
+        self.http.headers.update(self.headers)
+        # certifi's CA bundle verifies on macOS/LibreSSL too, and verified
+        # connections can resume TLS sessions on keep-alive
+        self.http.verify = certifi.where()
+        self.http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self._cache_lock = threading.Lock()
+        self._cache = self._load_cache()
+        atexit.register(self.save_cache)
+        threading.Thread(target=self._warm_models, daemon=True).start()
         print("✅ AI Service initialized (Hugging Face Inference API)")
 
+    def _warm_models(self) -> None:
+        """Tiny requests so HF loads the models before the first real upload
+        instead of making that user wait out a 503 cold start."""
+        silence = io.BytesIO()
+        with wave.open(silence, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\0\0" * 8000)  # 0.5s
+
+        warmups = [
+            lambda: self.http.post(f"{HF_API_URL}/{WHISPER_MODEL}",
+                                   headers={"Content-Type": "audio/wav"},
+                                   data=silence.getvalue(), timeout=60),
+            lambda: self.hf_client.text_classification("merhaba", model=SENTIMENT_MODEL),
+            lambda: self.hf_client.chat_completion(
+                messages=[{"role": "user", "content": "hi"}], model=CHAT_MODEL, max_tokens=1),
+        ]
+        if njit:
+            warmups.append(lambda: _audio_stats(np.frombuffer(b"\0\0" * 16, dtype="<i2"), 8))
+        for warmup in warmups:
+            try:
+                warmup()
+            except Exception:
+                pass
+        print("🔥 HF models warmed up", flush=True)
+
+    # ── Result cache ──────────────────────────────────────────────
+    @staticmethod
+    def _cache_key(kind: str, *parts: str) -> str:
+        h = hashlib.blake2b(kind.encode(), digest_size=16)
+        for part in parts:
+            h.update(b"\0" + part.encode("utf-8"))
+        return h.hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key: str, value) -> None:
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _load_cache() -> "OrderedDict[str, any]":
+        try:
+            with open(CACHE_PATH, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            return OrderedDict(items[-CACHE_MAX_ENTRIES:])
+        except (OSError, ValueError, TypeError):
+            return OrderedDict()
+
+    def save_cache(self) -> None:
+        """Persist the result cache so it survives restarts."""
+        try:
+            with self._cache_lock:
+                items = list(self._cache.items())
+            # API workers and the arq worker all save at exit: write a private
+            # temp file and swap it in, so readers never see a torn file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(items, f, ensure_ascii=False)
+                os.replace(tmp_path, CACHE_PATH)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"⚠️ Cache save failed: {e}", flush=True)
+
     # ── 1. Speech-to-Text (Whisper) ───────────────────────────────
     def transcribe_audio(self, audio_path: str) -> Dict[str, any]:
         """Transcribe audio file using HF Whisper API via raw requests
@@ -72,12 +259,11 @@ class AIService:
             print(f"   Audio size: {len(audio_bytes)} bytes", flush=True)
 
             url = f"{HF_API_URL}/{WHISPER_MODEL}"
-            headers = {**self.headers, "Content-Type": "audio/m4a"}
+            headers = {"Content-Type": "audio/m4a"}
 
             for attempt in range(5):
                 try:
-                    resp = requests.post(url, headers=headers, data=audio_bytes,
-                                         timeout=180, verify=False)
+                    resp = self.http.post(url, headers=headers, data=audio_bytes, timeout=180)
                     print(f"   Whisper HTTP {resp.status_code} (deneme {attempt+1})", flush=True)
 
                     if resp.status_code == 503:
@@ -108,45 +294,80 @@ class AIService:
             raise Exception(f"Transcription failed: {e}")
 
     # ── 1b. Audio Acoustic Analysis ────────────────────────────
+    @staticmethod
+    def _read_wav(audio_path: str):
+        """Decode 16 kHz 16-bit PCM WAV in-process (no ffmpeg subprocess).
+        Returns (samples, sample_rate), or None if ffmpeg is needed."""
+        with open(audio_path, "rb") as f:
+            header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        try:
+            with wave.open(audio_path, "rb") as w:
+                # Other rates go through ffmpeg, which low-pass filters while
+                # resampling; content above 8 kHz would otherwise inflate ZCR
+                if w.getsampwidth() != 2 or w.getframerate() != 16000:
+                    return None
+                channels = w.getnchannels()
+                sr = w.getframerate()
+                raw = w.readframes(w.getnframes())
+        except (wave.Error, EOFError):
+            return None  # e.g. float or compressed WAV
+
+        samples = np.frombuffer(raw, dtype="<i2", count=len(raw) // 2)
+        if channels > 1:
+            frames = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+            samples = frames.mean(axis=1).astype(np.int16)
+        return samples, sr
+
+    @staticmethod
+    def _ffmpeg_pcm(audio_path: str):
+        """Decode any format to 16 kHz mono PCM via ffmpeg."""
+        # Read ffmpeg's stdout in one pass (stderr is discarded instead of
+        # being buffered alongside it)
+        proc = subprocess.Popen(
+            [FFMPEG_PATH, '-i', audio_path, '-f', 's16le', '-acodec', 'pcm_s16le',
+             '-ar', '16000', '-ac', '1', '-'],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, bufsize=FFMPEG_PIPE_BUFSIZE
+        )
+        watchdog = threading.Timer(15, proc.kill)
+        watchdog.start()
+        try:
+            raw = proc.stdout.read()
+        finally:
+            watchdog.cancel()
+            proc.stdout.close()
+            proc.wait()
+        return np.frombuffer(raw, dtype="<i2", count=len(raw) // 2), 16000
+
     def analyze_audio_features(self, audio_path: str) -> Dict[str, any]:
-        """Extract acoustic features from audio using ffmpeg.
+        """Extract acoustic features from audio (WAV natively, else ffmpeg).
         Returns voice energy, variation, and descriptive cues."""
         try:
-            # Convert to raw PCM via ffmpeg
-            result = subprocess.run(
-                [FFMPEG_PATH, '-i', audio_path, '-f', 's16le', '-acodec', 'pcm_s16le',
-                 '-ar', '16000', '-ac', '1', '-'],
-                capture_output=True, stdin=subprocess.DEVNULL, timeout=15
-            )
-            raw = result.stdout
-            if len(raw) < 200:
+            samples, sr = self._read_wav(audio_path) or self._ffmpeg_pcm(audio_path)
+            if len(samples) < 100:
                 return {"description": "Ses analizi yapılamadı", "energy_level": "unknown"}
 
-            samples = struct.unpack(f'<{len(raw)//2}h', raw)
             n = len(samples)
-            sr = 16000
+            seg_size = sr // 2  # energy variation across 0.5s segments
+            seg_sums, peak, crossings = _audio_stats(samples, seg_size)
 
             # RMS energy
-            rms = math.sqrt(sum(s*s for s in samples) / n)
-            peak = max(abs(s) for s in samples)
-
-            # Energy variation across 0.5s segments
-            seg_size = sr // 2
-            segments = [samples[i:i+seg_size] for i in range(0, n, seg_size)]
-            energies = [math.sqrt(sum(s*s for s in seg) / len(seg))
-                        for seg in segments if len(seg) > 100]
-
-            if energies:
-                energy_mean = sum(energies) / len(energies)
-                energy_std = math.sqrt(sum((e - energy_mean)**2 for e in energies) / len(energies))
-                energy_cv = energy_std / energy_mean if energy_mean > 0 else 0
+            rms = math.sqrt(int(seg_sums.sum()) / n)
+            peak = int(peak)
+
+            # Segment energies (last one kept if > 100 samples)
+            seg_lens = np.diff(np.append(np.arange(0, n, seg_size), n))
+            energies = np.sqrt(seg_sums / seg_lens)[seg_lens > 100]
+            if energies.size:
+                energy_mean = float(energies.mean())
+                energy_cv = float(energies.std()) / energy_mean if energy_mean > 0 else 0
             else:
                 energy_cv = 0
 
             # Zero-crossing rate (correlates with pitch/excitement)
-            zero_crossings = sum(1 for i in range(1, n) if
-                                 (samples[i] >= 0) != (samples[i-1] >= 0))
-            zcr = zero_crossings / n
+            zcr = int(crossings) / n
 
             # Build descriptive cues
             cues = []
@@ -186,97 +407,190 @@ class AIService:
                 "rms": rms,
                 "energy_cv": energy_cv,
                 "zcr": zcr,
+                "peak": peak,
             }
         except Exception as e:
             print(f"⚠️ Audio analysis fallback: {e}", flush=True)
             return {"description": "Ses tonu analizi yapılamadı", "energy_level": "unknown"}
 
-    # ── 2. Sentiment Analysis (Qwen – metin + ses tonu) ──────────
-    def analyze_sentiment(self, text: str, voice_cues: str = "") -> Dict[str, any]:
-        """Analyze sentiment using Qwen – combines text content with voice tone cues."""
+    def _timed_audio_features(self, audio_path: str) -> Dict[str, any]:
+        t0 = time.time()
+        features = self.analyze_audio_features(audio_path)
+        print(f"   ⏱ Audio analysis: {time.time()-t0:.1f}s", flush=True)
+        return features
+
+    # ── 2. Sentiment Analysis (classifier + ses tonu) ────────────
+    def analyze_sentiment(self, text: str, voice_cues: str = "",
+                          audio_features: Optional[Dict[str, any]] = None) -> Dict[str, any]:
+        """Analyze sentiment with a multilingual classifier, nudged by voice tone.
+        Falls back to the Qwen prompt if the classifier call fails."""
+        cache_key = self._cache_key("sentiment", text, voice_cues)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            print(f"💭 Sentiment (cached): {cached['label']}", flush=True)
+            return dict(cached)
+
         try:
             print(f"💭 Sentiment: {text[:50]}…", flush=True)
 
-            if len(text.split()) > 400:
-                text = " ".join(text.split()[:400])
+            label, score = self._decide_sentiment(
+                text[:SENTIMENT_MAX_CHARS], voice_cues, audio_features or {})
 
-            voice_section = ""
-            if voice_cues:
-                voice_section = (
-                    "\n\nÖNEMLİ - Ses tonu bilgisi (akustik analiz sonucu):\n"
-                    "Aşağıdaki ses tonu ipuçlarını duygu tespitinde MUTLAKA dikkate al. "
-                    "Metin nötr görünse bile ses tonu duygusal olabilir. "
-                    "Ses tonu bilgisi metinden daha güvenilirdir çünkü doğrudan ses dalgasından ölçülmüştür.\n"
-                )
+            print(f"   ✅ Sentiment: {label} ({score:.2f})", flush=True)
+            result = {"label": label, "score": score}
+            self._cache_put(cache_key, result)
+            return dict(result)
 
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Sen bir duygu analizi uzmanısın. Sana verilen METİN ve SES TONU bilgisini birlikte değerlendirerek "
-                        "kişinin duygu durumunu analiz et.\n"
-                        "SADECE aşağıdaki JSON formatında yanıt ver, başka hiçbir şey yazma:\n"
-                        '{"label": "positive|negative|neutral", "score": 0.0-1.0}\n\n'
-                        "Kurallar:\n"
-                        "- positive: mutluluk, sevinç, heyecan, memnuniyet, şükran, umut, gülme, canlılık\n"
-                        "- negative: üzüntü, kızgınlık, öfke, hayal kırıklığı, korku, endişe, stres\n"
-                        "- neutral: SADECE hem metin hem ses tonu gerçekten nötrse\n"
-                        "- score: duygunun ne kadar güçlü olduğu (0.5 = zayıf, 1.0 = çok güçlü)\n"
-                        "- Ses tonu yüksek, değişken veya heyecanlıysa → nötr olma ihtimali çok düşüktür\n"
-                        "- Gülme, kahkaha, yüksek enerji → positive\n"
-                        "- Kısık, monoton, ağır ses → olası negative veya neutral\n"
-                        "- Sadece JSON döndür, açıklama yazma."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"METİN: \"{text}\""
-                        f"{voice_section}"
-                        f"{('Ses tonu ipuçları: ' + voice_cues) if voice_cues else ''}"
-                    )
-                }
-            ]
+        except Exception as e:
+            print(f"❌ Sentiment error: {e}", flush=True)
+            return {"label": "neutral", "score": 0.5}
 
-            result = self.hf_client.chat_completion(
-                messages=messages,
-                model=CHAT_MODEL,
-                max_tokens=50,
-                temperature=0.1,  # Deterministic for consistent classification
-            )
+    def _decide_sentiment(self, text: str, voice_cues: str, audio_features: Dict[str, any]):
+        """Cheapest source that can answer: voice only → lexicon → classifier → Qwen."""
+        if len(text.strip()) < SENTIMENT_MIN_CHARS:
+            # Too little text to classify ("test", "merhaba"); voice tone decides
+            print("   Short text, voice-only sentiment", flush=True)
+            lean = self._voice_lean(audio_features)
+            return (lean, 0.6) if lean in ("positive", "negative") else ("neutral", 0.5)
 
-            raw = result.choices[0].message.content.strip()
-            print(f"   Raw sentiment response: {raw}", flush=True)
+        local = self._local_sentiment(text, audio_features)
+        if local:
+            print("   Local lexicon + voice match, HF skipped", flush=True)
+            return local
 
-            # Parse JSON response
-            import json
-            # Handle cases where model wraps JSON in markdown code blocks
-            if "```" in raw:
-                raw = raw.split("```")[1]
-                if raw.startswith("json"):
-                    raw = raw[4:]
-                raw = raw.strip()
+        try:
+            return self._classify_sentiment(text, audio_features)
+        except Exception as e:
+            print(f"   Classifier fallback to {CHAT_MODEL}: {e}", flush=True)
+            return self._chat_sentiment(text, voice_cues)
+
+    @staticmethod
+    def _voice_lean(audio_features: Dict[str, any]) -> Optional[str]:
+        """Which way the voice alone points, using the same thresholds as the
+        cue descriptions in analyze_audio_features. Only laughter (high ZCR
+        with sudden peaks) reads as positive; any other loud or very variable
+        voice is "emotional": excited or angry, laughing or crying."""
+        rms = audio_features.get("rms")
+        energy_cv = audio_features.get("energy_cv", 0)
+        if rms is None:
+            return None
+        if audio_features.get("zcr", 0) > 0.15 and audio_features.get("peak", 0) > 20000:
+            return "positive"
+        if rms > 3000 or energy_cv > 0.6:
+            return "emotional"
+        if rms < 500 and energy_cv <= 0.35:
+            return "negative"
+        return None
+
+    def _local_sentiment(self, text: str, audio_features: Dict[str, any]):
+        """Return (label, score) when lexicon and voice tone clearly agree,
+        otherwise None so the caller asks the classifier. A lexicon hit in
+        a negated clause ("hiç mutlu olmadım") also defers to the classifier."""
+        hits = matched = 0
+        for clause in CLAUSE_SPLIT.split(text.lower()):
+            words = re.findall(r"\w+", clause)
+            polarities = [w.startswith(POSITIVE_WORDS) - w.startswith(NEGATIVE_WORDS)
+                          for w in words if w.startswith(POSITIVE_WORDS + NEGATIVE_WORDS)]
+            if not polarities:
+                continue
+            if any(w.startswith(NEGATION_WORDS) or NEGATED_VERB.search(w) for w in words):
+                return None
+            hits += sum(polarities)
+            matched += len(polarities)
+        text_score = hits / (matched + 1)  # 1 hit → 0.5, 3 hits → 0.75
+        if "!" in text:
+            text_score *= 1.2
+
+        voice_score = {"positive": 1.0, "negative": -1.0}.get(self._voice_lean(audio_features), 0.0)
+        local_score = 0.6 * text_score + 0.4 * voice_score
+        if abs(local_score) <= LOCAL_SENTIMENT_THRESHOLD:
+            return None
+        return ("positive" if local_score > 0 else "negative"), min(1.0, abs(local_score))
+
+    def _classify_sentiment(self, text: str, audio_features: Dict[str, any]):
+        """Encoder classifier returns per-label probabilities directly;
+        voice tone is applied afterwards as a small bias."""
+        output = self.hf_client.text_classification(text, model=SENTIMENT_MODEL)
+        scores = {"positive": 0.0, "negative": 0.0, "neutral": 0.0}
+        for item in output:
+            label = SENTIMENT_LABELS.get(item.label.lower())
+            if label:
+                scores[label] = max(scores[label], float(item.score))
+        if not any(scores.values()):
+            raise ValueError(f"unexpected classifier output: {output}")
+        print(f"   Classifier scores: {scores}", flush=True)
+
+        lean = self._voice_lean(audio_features)
+        if lean == "positive":
+            # Laughter
+            scores["neutral"] -= VOICE_BIAS
+            scores["positive"] += VOICE_BIAS
+        elif lean == "emotional":
+            # Loud or very variable voice → unlikely to be neutral, but the
+            # voice can't tell joy from anger, so keep the text's direction
+            scores["neutral"] -= VOICE_BIAS
+            stronger = max(("positive", "negative"), key=scores.get)
+            scores[stronger] += VOICE_BIAS
+        elif lean == "negative":
+            # Quiet, monotone voice → lean away from positive
+            scores["positive"] -= VOICE_BIAS
+            scores["negative"] += VOICE_BIAS / 2
+            scores["neutral"] += VOICE_BIAS / 2
+
+        label = max(scores, key=scores.get)
+        return label, max(0.0, min(1.0, scores[label]))
+
+    def _chat_sentiment(self, text: str, voice_cues: str):
+        """Qwen prompt combining text content with voice tone cues."""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "Metin ve ses tonuna göre duyguyu sınıflandır, JSON döndür: {label, score}.\n"
+                    "positive: mutluluk, heyecan, umut, gülme\n"
+                    "negative: üzüntü, öfke, korku, endişe, stres\n"
+                    "neutral: metin de ses tonu da nötr\n"
+                    "score: duygunun gücü (0.5 zayıf – 1.0 çok güçlü)"
+                )
+            },
+            {
+                "role": "user",
+                "content": f"METİN: \"{text}\"" + (f"\nSes tonu: {voice_cues}" if voice_cues else "")
+            }
+        ]
 
-            parsed = json.loads(raw)
-            label = parsed.get("label", "neutral").lower().strip()
-            score = float(parsed.get("score", 0.5))
+        result = self.hf_client.chat_completion(
+            messages=messages,
+            model=CHAT_MODEL,
+            max_tokens=20,
+            temperature=0.1,  # Deterministic for consistent classification
+            response_format=SENTIMENT_RESPONSE_FORMAT,
+        )
 
-            # Validate label
-            if label not in ("positive", "negative", "neutral"):
-                label = "neutral"
-            # Clamp score
-            score = max(0.0, min(1.0, score))
+        raw = result.choices[0].message.content.strip()
+        print(f"   Raw sentiment response: {raw}", flush=True)
 
-            print(f"   ✅ Sentiment: {label} ({score:.2f})", flush=True)
-            return {"label": label, "score": score}
+        parsed = json.loads(raw)
+        label = parsed.get("label", "neutral").lower().strip()
+        score = float(parsed.get("score", 0.5))
 
-        except Exception as e:
-            print(f"❌ Sentiment error: {e}", flush=True)
-            return {"label": "neutral", "score": 0.5}
+        # Validate label
+        if label not in ("positive", "negative", "neutral"):
+            label = "neutral"
+        # Clamp score
+        score = max(0.0, min(1.0, score))
+
+        return label, score
 
     # ── 3. AI Feedback (Chat Completion) ──────────────────────────
     def generate_feedback(self, transcription: str, sentiment: str) -> str:
         """Generate empathetic Turkish feedback via chat completion."""
+        cache_key = self._cache_key("feedback", transcription, sentiment)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            print(f"🧠 Feedback (cached, {sentiment})", flush=True)
+            return cached
+
         try:
             print(f"🧠 Feedback ({sentiment})…", flush=True)
 
@@ -287,15 +601,7 @@ class AIService:
             }.get(sentiment, "düşünceli")
 
             messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Sen empatik bir ses günlüğü asistanısın. "
-                        "Kullanıcının ses kaydını dinledin ve analiz ettin. "
-                        "Türkçe, sıcak, samimi ve destekleyici bir geri bildirim yaz. "
-                        "Maksimum 3 cümle. Kısa ve öz ol."
-                    )
-                },
+                {"role": "system", "content": "Türkçe, empatik, en fazla 3 cümle geri bildirim yaz."},
                 {
                     "role": "user",
                     "content": (
@@ -308,12 +614,13 @@ class AIService:
             result = self.hf_client.chat_completion(
                 messages=messages,
                 model=CHAT_MODEL,
-                max_tokens=200,
+                max_tokens=120,
                 temperature=0.7,
             )
 
             feedback = result.choices[0].message.content.strip()
             print(f"   ✅ Feedback: {feedback[:80]}…", flush=True)
+            self._cache_put(cache_key, feedback)
             return feedback
 
         except Exception as e:
@@ -331,39 +638,57 @@ class AIService:
         try:
             pipeline_start = time.time()
 
-            # Step 1: Transcribe
+            # Step 1 + 1b: Whisper (network) and acoustic analysis (local ffmpeg)
+            # are independent, so run the analysis underneath the HF round trip.
             t0 = time.time()
-            transcription_result = self.transcribe_audio(audio_path)
-            transcription_text = transcription_result["text"]
-            print(f"   ⏱ Whisper: {time.time()-t0:.1f}s", flush=True)
-
-            if not transcription_text or len(transcription_text.strip()) < 5:
-                return {
-                    "transcription_text": "Ses kaydı anlaşılamadı.",
-                    "sentiment_label": "neutral",
-                    "sentiment_score": 0.5,
-                    "ai_feedback": "Ses kalitesi düşük olduğu için analiz yapılamadı. Lütfen daha net kayıt yapın.",
-                    "language": "unknown"
-                }
-
-            # Step 1b: Acoustic analysis (parallel-safe, uses ffmpeg)
-            t0b = time.time()
-            audio_features = self.analyze_audio_features(audio_path)
+            pool = ThreadPoolExecutor(max_workers=1)
+            try:
+                audio_future = pool.submit(self._timed_audio_features, audio_path)
+                transcription_result = self.transcribe_audio(audio_path)
+                transcription_text = transcription_result["text"]
+                print(f"   ⏱ Whisper: {time.time()-t0:.1f}s", flush=True)
+
+                if not transcription_text or len(transcription_text.strip()) < 5:
+                    # The analysis is already running and can't be cancelled;
+                    # return without waiting for it (see shutdown below)
+                    return {
+                        "transcription_text": "Ses kaydı anlaşılamadı.",
+                        "sentiment_label": "neutral",
+                        "sentiment_score": 0.5,
+                        "ai_feedback": "Ses kalitesi düşük olduğu için analiz yapılamadı. Lütfen daha net kayıt yapın.",
+                        "language": "unknown"
+                    }
+
+                audio_features = audio_future.result()
+            finally:
+                pool.shutdown(wait=False)
             voice_cues = audio_features.get("description", "")
-            print(f"   ⏱ Audio analysis: {time.time()-t0b:.1f}s", flush=True)
 
-            # Step 2: Sentiment Analysis (text + voice cues)
+            # Step 2 + 3: Sentiment and Feedback. Feedback only depends on the
+            # label, so generate it for the label the voice suggests while
+            # sentiment runs, and regenerate only if that guess was wrong.
+            # An "emotional" voice fits joy and anger alike, so no guess then.
             t1 = time.time()
-            sentiment_result = self.analyze_sentiment(transcription_text, voice_cues)
-            print(f"   ⏱ Sentiment: {time.time()-t1:.1f}s", flush=True)
-
-            # Step 3: Generate Feedback
-            t2 = time.time()
-            ai_feedback = self.generate_feedback(
-                transcription_text,
-                sentiment_result["label"]
-            )
-            print(f"   ⏱ Feedback: {time.time()-t2:.1f}s", flush=True)
+            lean = self._voice_lean(audio_features)
+            guess = None if lean == "emotional" else (lean or "neutral")
+            pool = ThreadPoolExecutor(max_workers=1)
+            try:
+                feedback_future = pool.submit(self.generate_feedback, transcription_text, guess) if guess else None
+                sentiment_result = self.analyze_sentiment(transcription_text, voice_cues, audio_features)
+                print(f"   ⏱ Sentiment: {time.time()-t1:.1f}s", flush=True)
+
+                if feedback_future and sentiment_result["label"] == guess:
+                    ai_feedback = feedback_future.result()
+                else:
+                    if feedback_future:
+                        feedback_future.cancel()
+                    ai_feedback = self.generate_feedback(
+                        transcription_text,
+                        sentiment_result["label"]
+                    )
+            finally:
+                pool.shutdown(wait=False)  # don't wait on a discarded guess
+            print(f"   ⏱ Sentiment + feedback (guess={guess}): {time.time()-t1:.1f}s", flush=True)
             print(f"   ⏱ Total pipeline: {time.time()-pipeline_start:.1f}s", flush=True)
 
             return {
@@ -380,11 +705,14 @@ class AIService:
 
 # ── Singleton ─────────────────────────────────────────────────────
 _ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
 
 
 def get_ai_service() -> AIService:
-    """Get or create AI service singleton."""
+    """Get or create AI service singleton (safe under concurrent first use)."""
     global _ai_service
     if _ai_service is None:
-        _ai_service = AIService()
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
     return _ai_service
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, Session
 from models import Base
 import os
@@ -11,11 +12,55 @@ load_dotenv(os.path.join(_backend_dir, ".env"))
 _db_path = os.path.join(_backend_dir, "voice_diary.db")
 DATABASE_URL = f"sqlite:///{_db_path}"
 
-engine = create_engine(DATABASE_URL, echo=True, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQL statement logging is expensive; opt in with SQL_ECHO=true when debugging
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_pre_ping=True,   # drop dead connections instead of failing a request
+    pool_recycle=3600,
+    pool_use_lifo=True,   # reuse the warmest connection, let idle ones expire
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def _sqlite_pragmas(dbapi_conn, _):
+    # WAL lets readers (entry polling) proceed while the AI worker writes
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+# PRAGMAs are SQLite-only; skip them if DATABASE_URL ever points elsewhere
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _sqlite_pragmas)
+
+def init_db(attempts: int = 5):
+    # Every worker process runs this at startup; another one may create a
+    # table or index between our existence check and CREATE, so on
+    # "already exists" simply check again
+    for attempt in range(attempts):
+        try:
+            Base.metadata.create_all(bind=engine)
+            # create_all skips existing tables, so add indexes introduced later
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            break
+        except OperationalError as e:
+            if "already exists" not in str(e) or attempt == attempts - 1:
+                raise
+    print(f"   DB pool: {engine.pool.status()}")
 
 def get_session() -> Session:
     db = SessionLocal()
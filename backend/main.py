@@ -1,16 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, BackgroundTasks, Query, Request
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+from concurrent.futures import ThreadPoolExecutor
 import os
+import re
 import uuid
+import json
+import base64
+import shutil
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 
 from database import get_session, init_db
 from models import DiaryEntry
 from ai_service import get_ai_service
+from worker import run_ai_processing
 
 # Load .env from the same directory as this file (works with --app-dir)
 _backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,7 +31,8 @@ load_dotenv(os.path.join(_backend_dir, ".env"))
 app = FastAPI(
     title="AI Voice Diary API",
     description="Backend API for AI Voice Diary mobile application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -31,20 +44,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class AudioSkippingGZipMiddleware(GZipMiddleware):
+    """Gzip JSON responses but pass /audio through untouched: the files are
+    already compressed, and byte ranges must refer to the stored file."""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/audio/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(AudioSkippingGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configuration – resolve relative to backend directory
 _upload_dir_raw = os.getenv("UPLOAD_DIR", "uploads")
 UPLOAD_DIR = _upload_dir_raw if os.path.isabs(_upload_dir_raw) else os.path.join(_backend_dir, _upload_dir_raw)
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 52428800))  # 50MB
-ALLOWED_EXTENSIONS = {".m4a", ".mp3", ".wav", ".aac"}
+ALLOWED_EXTENSIONS = frozenset({".m4a", ".mp3", ".wav", ".aac"})
+ALLOWED_ERROR_MSG = f"Invalid file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
+TOO_LARGE_ERROR_MSG = f"File too large. Max size: {MAX_FILE_SIZE / (1024 * 1024):g}MB"
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", 4))
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+# When set, AI jobs go to a Redis queue consumed by `arq worker.WorkerSettings`
+# instead of running inside this API process
+REDIS_URL = os.getenv("REDIS_URL")
+# Finished entries are cached in that same Redis for this many seconds
+ENTRY_CACHE_TTL = int(os.getenv("ENTRY_CACHE_TTL", 300))
+ENTRY_TOMBSTONE_TTL = 60
+# Uploaded audio is stored under a random UUID and never rewritten
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+AUDIO_MEDIA_TYPES = {".m4a": "audio/mp4", ".mp3": "audio/mpeg", ".wav": "audio/wav", ".aac": "audio/aac"}
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+# One shared pool for all uploads: bounds concurrent HF calls and lets the
+# pipelines share AIService's keep-alive connections.
+_ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="ai")
+_arq_pool: Optional[ArqRedis] = None
 
 # Create upload directory
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @app.on_event("startup")
-def startup():
+async def startup():
+    global _arq_pool
     init_db()
     print("✅ Database initialized")
     
+    if REDIS_URL:
+        _arq_pool = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+        print("✅ AI jobs will be queued to Redis (arq worker)")
+        return
+    
     # Initialize AI Service
     try:
         get_ai_service()
@@ -53,62 +102,15 @@ def startup():
         print(f"⚠️  AI Service initialization failed: {e}")
         print("   API will work without AI features")
 
-def _run_ai_processing(entry_id: int, audio_path: str):
-    """Actual AI work — runs in a separate thread."""
-    import traceback as _tb
-    try:
-        import time as _time
-        t_start = _time.time()
-        print(f"🤖 Starting AI processing for entry {entry_id}", flush=True)
-        
-        # Get AI service
-        ai_service = get_ai_service()
-        
-        # Process audio
-        ai_results = ai_service.process_audio_full(audio_path)
-        
-        # Update database entry (create new session for background task)
-        from database import SessionLocal
-        session = SessionLocal()
-        try:
-            entry = session.query(DiaryEntry).filter(DiaryEntry.id == entry_id).first()
-            if entry:
-                entry.transcription_text = ai_results["transcription_text"]
-                entry.sentiment_label = ai_results["sentiment_label"]
-                entry.sentiment_score = ai_results["sentiment_score"]
-                entry.ai_feedback = ai_results["ai_feedback"]
-                session.commit()
-                print(f"✅ AI processing completed for entry {entry_id}", flush=True)
-            else:
-                print(f"❌ Entry {entry_id} not found", flush=True)
-        finally:
-            session.close()
-    except Exception as e:
-        print(f"❌ AI processing error for entry {entry_id}: {str(e)}", flush=True)
-        _tb.print_exc()
-        # Update entry with error message
-        try:
-            from database import SessionLocal
-            session = SessionLocal()
-            entry = session.query(DiaryEntry).filter(DiaryEntry.id == entry_id).first()
-            if entry:
-                entry.transcription_text = "AI analizi başarısız oldu."
-                entry.ai_feedback = f"Analiz hatası: {str(e)}"
-                session.commit()
-            session.close()
-        except:
-            pass
-    except BaseException as be:
-        print(f"💥 THREAD CRASH for entry {entry_id}: {be}", flush=True)
-        _tb.print_exc()
-
+@app.on_event("shutdown")
+async def shutdown():
+    if _arq_pool is not None:
+        await _arq_pool.close()
 
 def process_audio_with_ai(entry_id: int, audio_path: str):
     """Background task wrapper — runs AI processing in a thread pool
     so it doesn't block uvicorn's main thread (polling stays fast)."""
-    import concurrent.futures
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
-    executor.submit(_run_ai_processing, entry_id, audio_path)
+    _ai_executor.submit(run_ai_processing, entry_id, audio_path)
 
 @app.get("/")
 def root():
@@ -118,8 +120,45 @@ def root():
         "status": "running"
     }
 
+def _create_entry(session: Session, file_path: str) -> DiaryEntry:
+    # id and the DB-side timestamps come back via INSERT ... RETURNING
+    new_entry = DiaryEntry(audio_file_path=file_path)
+    session.add(new_entry)
+    session.commit()
+    return new_entry
+
+def _save_upload(src, file_path: str) -> int:
+    """
+    Copy the spooled upload to file_path, stopping just past MAX_FILE_SIZE.
+    Returns the number of bytes written.
+    """
+    limit = MAX_FILE_SIZE + 1
+    src.seek(0)
+    # The shard directory is only created once the upload passed the early
+    # size check, so rejected uploads leave nothing behind
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as dst:
+        # Spools that rolled over to disk have a real fd, so the kernel can
+        # copy the bytes without them passing through Python
+        if getattr(src, "_rolled", True):
+            try:
+                offset = 0
+                while offset < limit:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, limit - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                return dst.tell()
+            except (AttributeError, OSError):
+                # No sendfile to regular files on this platform
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+        return dst.tell()
+
 @app.post("/upload-audio")
-def upload_audio(
+async def upload_audio(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     session: Session = Depends(get_session)
@@ -129,138 +168,298 @@ def upload_audio(
     Triggers AI analysis in background.
     """
     # Validate file extension
-    file_ext = os.path.splitext(file.filename)[1].lower()
+    _, dot, suffix = (file.filename or "").rpartition(".")
+    file_ext = "." + suffix.lower() if dot else ""
     if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
+        raise HTTPException(status_code=400, detail=ALLOWED_ERROR_MSG)
     
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    # Generate unique filename, sharded by the first hex pairs (uploads/ab/cd/<uid>.m4a) so no single
+    # directory grows large enough to slow down lookups
+    uid = uuid.uuid4().hex
+    file_path = os.path.join(UPLOAD_DIR, uid[:2], uid[2:4], f"{uid}{file_ext}")
+    
+    # Starlette has already spooled the body, so its size is usually known
+    # and an oversized upload is rejected before anything touches UPLOAD_DIR
+    size = file.size or 0
+    if size <= MAX_FILE_SIZE:
+        # Copy off the event loop; the size written is re-checked below for
+        # uploads whose size wasn't reported
+        try:
+            size = await run_in_threadpool(_save_upload, file.file, file_path)
+        except Exception as e:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+    
+    # Check file size
+    if size > MAX_FILE_SIZE:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise HTTPException(status_code=400, detail=TOO_LARGE_ERROR_MSG)
     
-    # Save file
+    # Create database entry (sync session → worker thread)
     try:
-        contents = file.file.read()
-        
-        # Check file size
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Max size: {MAX_FILE_SIZE / 1024 / 1024}MB"
-            )
-        
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        new_entry = await run_in_threadpool(_create_entry, session, file_path)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+        # Clean up file if database insert fails
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     
-    # Create database entry
-    try:
-        new_entry = DiaryEntry(
-            audio_file_path=file_path,
-            created_at=datetime.utcnow()
-        )
-        session.add(new_entry)
-        session.commit()
-        session.refresh(new_entry)
-        
-        # Trigger AI processing in background
+    # Trigger AI processing in background. The row is already committed, so
+    # if Redis is unreachable the entry is processed in this process rather
+    # than left waiting for a job that was never queued.
+    queued = False
+    if _arq_pool is not None:
+        try:
+            await _arq_pool.enqueue_job("process_audio_job", new_entry.id, file_path)
+            queued = True
+        except Exception as e:
+            print(f"⚠️  Could not queue AI job for entry {new_entry.id}, processing in-process: {e}", flush=True)
+    if not queued:
         background_tasks.add_task(
             process_audio_with_ai,
             new_entry.id,
             file_path
         )
-        
-        return {
-            "message": "Audio uploaded successfully. AI analysis started.",
-            "entry": new_entry.to_dict()
-        }
-    except Exception as e:
-        # Clean up file if database insert fails
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    return {
+        "message": "Audio uploaded successfully. AI analysis started.",
+        "entry": new_entry.to_dict()
+    }
+
+# Columns served by the list endpoint: selected as plain rows, so a page
+# never builds ORM instances or touches the identity map
+ENTRY_COLS = (
+    DiaryEntry.id,
+    DiaryEntry.audio_file_path,
+    DiaryEntry.transcription_text,
+    DiaryEntry.sentiment_label,
+    DiaryEntry.sentiment_score,
+    DiaryEntry.ai_feedback,
+    DiaryEntry.created_at,
+    DiaryEntry.updated_at,
+)
+ENTRY_FIELDS = {col.key: col for col in ENTRY_COLS}
+
+def _select_fields(fields: Optional[str]):
+    """Columns for ?fields=a,b — id and created_at are always included
+    because the cursor is built from them."""
+    if not fields:
+        return ENTRY_COLS
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - ENTRY_FIELDS.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    names |= {"id", "created_at"}
+    return tuple(col for key, col in ENTRY_FIELDS.items() if key in names)
+
+def _encode_cursor(row) -> str:
+    payload = json.dumps({"ts": row.created_at.isoformat(), "id": row.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["ts"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/entries")
 def get_entries(
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    with_total: bool = False,
+    fields: Optional[str] = None,
     session: Session = Depends(get_session)
 ):
-    """Get all diary entries with pagination"""
+    """Get diary entries, newest first.
+    Pass the returned next_cursor to get the following page; skip is kept
+    for older clients but scans every skipped row. total is only counted
+    when with_total=true. fields=id,sentiment_label,... trims each entry
+    (e.g. leave out transcription_text/ai_feedback for a list preview)."""
     try:
-        entries = session.query(DiaryEntry).order_by(DiaryEntry.created_at.desc()).offset(skip).limit(limit).all()
+        stmt = select(*_select_fields(fields)).order_by(DiaryEntry.created_at.desc(), DiaryEntry.id.desc())
+        if cursor:
+            ts, last_id = _decode_cursor(cursor)
+            stmt = stmt.where(tuple_(DiaryEntry.created_at, DiaryEntry.id) < (ts, last_id))
+        elif skip:
+            stmt = stmt.offset(skip)
+        rows = session.execute(stmt.limit(limit)).all()
+        total = session.execute(select(func.count()).select_from(DiaryEntry)).scalar() if with_total else None
         
         return {
-            "entries": [entry.to_dict() for entry in entries],
-            "total": len(entries)
+            "entries": [dict(row._mapping) for row in rows],
+            "total": total,
+            "next_cursor": _encode_cursor(rows[-1]) if len(rows) == limit else None
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _entry_cache_key(entry_id: int) -> str:
+    return f"vd:entry:{entry_id}"
+
+async def _entry_cache(op: str, *args, **kwargs):
+    """Best-effort Redis call for the entry cache: failures are logged and
+    read as a miss, so requests fall back to the DB when Redis is down."""
+    if _arq_pool is None:
+        return None
+    try:
+        return await getattr(_arq_pool, op)(*args, **kwargs)
+    except Exception as e:
+        print(f"⚠️  Entry cache {op} failed: {e}", flush=True)
+        return None
+
+def _load_entry(session: Session, entry_id: int) -> Optional[dict]:
+    entry = session.get(DiaryEntry, entry_id)
+    return entry.to_dict() if entry else None
+
 @app.get("/entries/{entry_id}")
-def get_entry(
+async def get_entry(
     entry_id: int,
     session: Session = Depends(get_session)
 ):
     """Get single diary entry by ID"""
+    # An entry stops changing once AI processing has written its feedback,
+    # so with Redis configured those are served without touching the DB.
+    # An empty value is a delete tombstone and is treated as a miss.
+    cache_key = _entry_cache_key(entry_id)
+    cached = await _entry_cache("get", cache_key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
     try:
-        entry = session.query(DiaryEntry).filter(DiaryEntry.id == entry_id).first()
-        
-        if not entry:
-            raise HTTPException(status_code=404, detail="Entry not found")
-        
-        return entry.to_dict()
-    except HTTPException:
-        raise
+        entry = await run_in_threadpool(_load_entry, session, entry_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    response = ORJSONResponse(entry)
+    if entry["ai_feedback"] is not None:
+        # nx: a delete that committed after our read has left a tombstone,
+        # which must not be replaced by the row we just loaded
+        await _entry_cache("set", cache_key, response.body, ex=ENTRY_CACHE_TTL, nx=True)
+    return response
+
+def _delete_entry_row(session: Session, entry_id: int) -> Optional[str]:
+    """Delete the row and return its audio path in one statement
+    (RETURNING needs SQLite >= 3.35)."""
+    row = session.execute(
+        delete(DiaryEntry)
+        .where(DiaryEntry.id == entry_id)
+        .returning(DiaryEntry.audio_file_path)
+    ).first()
+    session.commit()
+    return row.audio_file_path if row else None
 
 @app.delete("/entries/{entry_id}")
-def delete_entry(
+async def delete_entry(
     entry_id: int,
     session: Session = Depends(get_session)
 ):
     """Delete diary entry and associated audio file"""
     try:
-        # Get entry first
-        entry = session.query(DiaryEntry).filter(DiaryEntry.id == entry_id).first()
-        
-        if not entry:
-            raise HTTPException(status_code=404, detail="Entry not found")
-        
-        # Delete audio file
-        if os.path.exists(entry.audio_file_path):
-            os.remove(entry.audio_file_path)
-        
-        # Delete from database
-        session.delete(entry)
-        session.commit()
-        
-        return {"message": "Entry deleted successfully"}
-    except HTTPException:
-        raise
+        audio_path = await run_in_threadpool(_delete_entry_row, session, entry_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if audio_path is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    # Remove the audio only once the delete is committed, so a rollback
+    # never leaves a row pointing at a missing file
+    if os.path.exists(audio_path):
+        os.remove(audio_path)
+    
+    # Replace any cached copy with a short-lived tombstone so a concurrent
+    # GET that read the row before the delete can't cache it again
+    await _entry_cache("set", _entry_cache_key(entry_id), b"", ex=ENTRY_TOMBSTONE_TTL)
+    
+    return {"message": "Entry deleted successfully"}
+
+def _audio_range_response(path: str, range_header: str, headers: dict, media_type: str) -> Optional[Response]:
+    """206 reply for a single byte range (players seek this way).
+    Returns None for anything else so the caller sends the whole file."""
+    match = _RANGE_RE.fullmatch(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None  # invalid range: ignore the header (RFC 9110 §14.2)
+    file_size = os.path.getsize(path)
+    if first:
+        start = int(first)
+        end = min(int(last), file_size - 1) if last else file_size - 1
+    else:  # suffix range: the last N bytes
+        start = max(0, file_size - int(last))
+        end = file_size - 1
+    if start > end or start >= file_size:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    def body():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = f.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(body(), status_code=206, media_type=media_type, headers={
+        **headers,
+        "Content-Range": f"bytes {start}-{end}/{file_size}",
+        "Content-Length": str(end - start + 1),
+    })
 
 @app.get("/audio/{entry_id}")
 def get_audio(
     entry_id: int,
+    request: Request,
     session: Session = Depends(get_session)
 ):
     """Stream audio file for playback"""
     try:
-        entry = session.query(DiaryEntry).filter(DiaryEntry.id == entry_id).first()
+        entry = session.get(DiaryEntry, entry_id)
         
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found")
         
+        # The UUID file name is a strong validator for immutable content
+        file_name = os.path.basename(entry.audio_file_path)
+        stem, ext = os.path.splitext(file_name)
+        etag = f'"{stem}"'
+        headers = {"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        
         if not os.path.exists(entry.audio_file_path):
             raise HTTPException(status_code=404, detail="Audio file not found")
         
-        return FileResponse(entry.audio_file_path)
+        media_type = AUDIO_MEDIA_TYPES.get(ext.lower(), "application/octet-stream")
+        range_header = request.headers.get("range")
+        # If-Range: only send part of the file the client already has part of;
+        # on a validator mismatch (or a date) it gets the whole file
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            partial = _audio_range_response(entry.audio_file_path, range_header, headers, media_type)
+            if partial is not None:
+                return partial
+        
+        return FileResponse(
+            entry.audio_file_path,
+            media_type=media_type,
+            filename=file_name,
+            content_disposition_type="inline",
+            headers=headers
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -271,9 +470,30 @@ def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": int(time.time())
     }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # DEV=true: single auto-reloading process. Otherwise WEB_CONCURRENCY
+    # workers, defaulting to one per core only when AI jobs go to the arq
+    # worker: without Redis every process would run its own AI pool and
+    # warm-up, multiplying the AI_MAX_WORKERS limit on concurrent HF calls.
+    # "auto" picks uvloop/httptools when installed (uvicorn[standard]) and
+    # falls back where they aren't, e.g. on Windows.
+    dev = os.getenv("DEV", "false").lower() == "true"
+    default_workers = (os.cpu_count() or 1) if REDIS_URL else 1
+    # Create the schema once here so the workers' startup only finds it
+    # in place (init_db also tolerates workers racing on a fresh DB)
+    init_db()
+    uvicorn.run(
+        "main:app",
+        app_dir=_backend_dir,
+        host="0.0.0.0",
+        port=8000,
+        reload=dev,
+        workers=1 if dev else int(os.getenv("WEB_CONCURRENCY", default_workers)),
+        loop="auto",
+        http="auto",
+        log_level="info" if dev else "warning",
+    )
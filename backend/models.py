@@ -1,9 +1,36 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
+from sqlalchemy.sql.expression import FunctionElement
 
 Base = declarative_base()
 
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, evaluated by the database inside
+    the statement (SQLite, PostgreSQL, MySQL; elsewhere CURRENT_TIMESTAMP)."""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() is session-local; shift it to UTC for the naive column
+    return "timezone('utc', now())"
+
+@compiles(utcnow, "mysql")
+def _utcnow_mysql(element, compiler, **kw):
+    # Parenthesised so it is also accepted as a column DEFAULT (MySQL 8.0.13+)
+    return "(UTC_TIMESTAMP(6))"
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    # Same text layout SQLAlchemy writes for Python datetimes, so values from
+    # either source still sort correctly in the /entries keyset comparison
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
 class DiaryEntry(Base):
     __tablename__ = "diary_entries"
 
@@ -13,8 +40,10 @@ class DiaryEntry(Base):
     sentiment_label = Column(String, nullable=True)  # positive, negative, neutral
     sentiment_score = Column(Float, nullable=True)
     ai_feedback = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Filled in by the database. The SQL default is also sent inline with
+    # each INSERT, since create_all never adds server_default to existing tables
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow(), nullable=False)
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow(), nullable=False)
 
     def to_dict(self):
         return {
@@ -24,6 +53,16 @@ class DiaryEntry(Base):
             "sentiment_label": self.sentiment_label,
             "sentiment_score": self.sentiment_score,
             "ai_feedback": self.ai_feedback,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
+
+# Matches the /entries ordering, so keyset pages are a single index range scan.
+# On PostgreSQL the small list columns are INCLUDEd, making it a covering
+# index (index-only scans when the large text columns aren't requested).
+Index(
+    "ix_diary_created_id",
+    DiaryEntry.created_at.desc(),
+    DiaryEntry.id.desc(),
+    postgresql_include=["audio_file_path", "sentiment_label", "sentiment_score"],
+)
@@ -69,7 +69,7 @@ def test_upload_and_process():
         
         # Test 7: List all entries
         print("7️⃣ Listing all entries:")
-        response = requests.get(f"{BASE_URL}/entries")
+        response = requests.get(f"{BASE_URL}/entries", params={"with_total": "true"})
         entries_data = response.json()
         print(f"   Total entries: {entries_data['total']}")
         print()
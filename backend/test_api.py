@@ -45,7 +45,7 @@ def test_upload_audio():
 def test_get_entries():
     """Test get all entries"""
     print("🔍 Testing get all entries...")
-    response = requests.get(f"{BASE_URL}/entries")
+    response = requests.get(f"{BASE_URL}/entries", params={"with_total": "true"})
     print(f"Status: {response.status_code}")
     data = response.json()
     print(f"Total entries: {data['total']}\n")
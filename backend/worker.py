@@ -0,0 +1,95 @@
+"""
+AI worker for Voice Diary Application
+Runs the transcription → sentiment → feedback pipeline for an entry and
+stores the results.
+
+With REDIS_URL set, the API only enqueues jobs and a separate process
+consumes them, so AI work never competes with request handling:
+
+    arq worker.WorkerSettings
+
+Without it, main.py calls run_ai_processing on its own thread pool.
+"""
+
+import asyncio
+import os
+import traceback
+from arq.connections import RedisSettings
+from dotenv import load_dotenv
+
+from database import SessionLocal
+from models import DiaryEntry
+from ai_service import get_ai_service
+
+_backend_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(_backend_dir, ".env"))
+
+
+def _save_results(entry_id: int, **fields) -> bool:
+    """Write pipeline output in a short-lived session of its own (never the
+    request's session, which is closed once the upload response is sent)."""
+    with SessionLocal() as session:
+        entry = session.get(DiaryEntry, entry_id)
+        if entry is None:
+            return False
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        session.commit()
+        return True
+
+
+def run_ai_processing(entry_id: int, audio_path: str):
+    """Actual AI work — runs in an API pool thread or an arq worker thread."""
+    try:
+        print(f"🤖 Starting AI processing for entry {entry_id}", flush=True)
+        
+        # Get AI service
+        ai_service = get_ai_service()
+        
+        # Process audio
+        ai_results = ai_service.process_audio_full(audio_path)
+        
+        # Update database entry
+        saved = _save_results(
+            entry_id,
+            transcription_text=ai_results["transcription_text"],
+            sentiment_label=ai_results["sentiment_label"],
+            sentiment_score=ai_results["sentiment_score"],
+            ai_feedback=ai_results["ai_feedback"],
+        )
+        if saved:
+            print(f"✅ AI processing completed for entry {entry_id}", flush=True)
+        else:
+            print(f"❌ Entry {entry_id} not found", flush=True)
+    except Exception as e:
+        print(f"❌ AI processing error for entry {entry_id}: {str(e)}", flush=True)
+        traceback.print_exc()
+        # Update entry with error message
+        try:
+            _save_results(
+                entry_id,
+                transcription_text="AI analizi başarısız oldu.",
+                ai_feedback=f"Analiz hatası: {str(e)}",
+            )
+        except Exception:
+            pass
+    except BaseException as be:
+        print(f"💥 THREAD CRASH for entry {entry_id}: {be}", flush=True)
+        traceback.print_exc()
+
+
+async def process_audio_job(ctx, entry_id: int, audio_path: str):
+    """arq job: the pipeline is blocking (HTTP + numpy), so run it in a thread."""
+    await asyncio.to_thread(run_ai_processing, entry_id, audio_path)
+
+
+async def startup(ctx):
+    await asyncio.to_thread(get_ai_service)
+
+
+class WorkerSettings:
+    functions = [process_audio_job]
+    on_startup = startup
+    redis_settings = RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    max_jobs = int(os.getenv("AI_MAX_WORKERS", 4))
+    job_timeout = 900  # Whisper alone may retry for several minutes